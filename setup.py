@@ -36,7 +36,8 @@ CLASSIFIERS = ['Intended Audience :: Science/Research',
 EXTRAS_REQUIRE = {
     'tests': [
         'pytest',
-        'pytest-cov'],
+        'pytest-cov',
+        'pytest-xdist'],
     'docs': [
         'sphinx',
         'sphinx-gallery',
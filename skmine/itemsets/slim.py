@@ -9,11 +9,12 @@ from itertools import chain
 
 import numpy as np
 import pandas as pd
+import scipy.sparse
 from sortedcontainers import SortedDict
 from pyroaring import BitMap as Bitmap
 
 from ..base import BaseMiner, InteractiveMiner, MDLOptimizer
-from ..utils import _check_D, supervised_to_unsupervised
+from ..utils import _check_D, bitmap_from_array, supervised_to_unsupervised
 
 
 def _to_vertical(D, stop_items=set(), return_len=False):
@@ -29,6 +30,55 @@ def _to_vertical(D, stop_items=set(), return_len=False):
     return dict(res)
 
 
+def _tabular_to_vertical(D):
+    """
+    vertical representation of tabular binary data
+
+    Columns are grouped by storage, and non-zero positions are extracted
+    in bulk for each group, rather than querying columns one by one:
+
+    - sparse columns with a zero fill value go through a single CSC matrix
+    - dense columns go through a single ``np.nonzero`` call
+    - remaining sparse columns (non-zero or missing fill value) are densified
+      one at a time
+
+    Parameters
+    ----------
+    D: pd.DataFrame
+        binary data
+
+    Returns
+    -------
+    dict[object, Bitmap]
+    """
+    sparse_idx, dense_idx, other_idx = [], [], []
+    for idx, dtype in enumerate(D.dtypes):
+        if not isinstance(dtype, pd.SparseDtype):
+            dense_idx.append(idx)
+        elif not pd.isna(dtype.fill_value) and dtype.fill_value == 0:
+            sparse_idx.append(idx)
+        else:
+            other_idx.append(idx)
+
+    def block(idx):  # avoid copying D if a single group covers all its columns
+        return D if len(idx) == len(D.columns) else D.iloc[:, idx]
+
+    tids = dict()
+    if sparse_idx:
+        mat = scipy.sparse.csc_matrix(block(sparse_idx).sparse.to_coo())
+        mat.eliminate_zeros()
+        splits = np.split(mat.indices, mat.indptr[1:-1])
+        tids.update(zip(sparse_idx, splits))
+    if dense_idx:
+        items, rows = np.nonzero(block(dense_idx).to_numpy().T)
+        bounds = np.cumsum(np.bincount(items, minlength=len(dense_idx)))[:-1]
+        tids.update(zip(dense_idx, np.split(rows, bounds)))
+    for idx in other_idx:
+        tids[idx] = np.flatnonzero(D.iloc[:, idx].to_numpy())
+
+    return {k: bitmap_from_array(tids[idx]) for idx, k in enumerate(D.columns)}
+
+
 def _log2(values):
     res_index = values.index if isinstance(values, pd.Series) else None
     res = np.zeros(len(values), dtype=np.float32)
@@ -73,8 +123,8 @@ def generate_candidates_big(codetable, stack=set(), depth=None):
 
     Parameters
     ----------
-    codetable: SortedDict[frozenset, Bitmap]
-        A codetable, sorted in Standard Candidate Order
+    codetable: Mapping[frozenset, Bitmap]
+        A codetable, iterating in Standard Candidate Order
 
     stack: set[frozenset], defaut=set()
         A stack of already seen itemsets, which will not be considered in output
@@ -84,10 +134,10 @@ def generate_candidates_big(codetable, stack=set(), depth=None):
     --------
     generate_candidates
     """
-    assert isinstance(codetable, SortedDict)
-    depth = depth or int(np.log2(len(codetable)) * 1e2)
-    for idx, (X, X_usage) in enumerate(codetable.items()):
-        Y = codetable.items()[idx + 1: idx + 1 + depth]
+    items = list(codetable.items())
+    depth = depth or int(np.log2(len(items)) * 1e2)
+    for idx, (X, X_usage) in enumerate(items):
+        Y = items[idx + 1: idx + 1 + depth]
         _best_usage = 0
         best_XY = None
         for y, y_usage in Y:
@@ -272,7 +322,8 @@ class SLIM(BaseMiner, MDLOptimizer, InteractiveMiner):
         -------
         iterator[tuple(frozenset, Bitmap)]
         """
-        ct = SortedDict(self._standard_candidate_order, self.codetable_.items())
+        order = sorted(self.codetable_, key=self._standard_candidate_order)
+        ct = {iset: self.codetable_[iset] for iset in order}
         return generate_candidates(ct, stack=stack)
 
     def evaluate(self, candidate):
@@ -371,11 +422,8 @@ class SLIM(BaseMiner, MDLOptimizer, InteractiveMiner):
         """
         if hasattr(D, "shape") and len(D.shape) == 2:  # tabular
             D = _check_D(D)
-            D_sct = {
-                k: Bitmap(np.where(D[k])[0])
-                for k in D.columns
-                if k in self.standard_codetable_
-            }
+            seen = [k for k in D.columns if k in self.standard_codetable_]
+            D_sct = _tabular_to_vertical(D[seen])
         else:  # transactional
             D_sct = _to_vertical(D)
 
@@ -486,7 +534,7 @@ class SLIM(BaseMiner, MDLOptimizer, InteractiveMiner):
             D = _check_D(D)
             if y is not None:
                 D = supervised_to_unsupervised(D, y)  # SKLEARN_COMPAT
-            item_to_tids = {k: Bitmap(np.where(D[k])[0]) for k in D.columns}
+            item_to_tids = _tabular_to_vertical(D)
         else:
             item_to_tids = _to_vertical(D)
         sct = pd.Series(item_to_tids)
@@ -1,26 +1,65 @@
+from functools import lru_cache
 from itertools import compress
 
 import numpy as np
 import pandas as pd
 import pytest
-from sortedcontainers import SortedDict
 
 from pyroaring import BitMap as Bitmap
 
-from ..slim import SLIM, _to_vertical, generate_candidates
+from ..slim import SLIM, _tabular_to_vertical, _to_vertical, generate_candidates
 
-
-@pytest.fixture
-def D():
-    return pd.Series(["ABC"] * 5 + ["AB", "A", "B"])
+# expected codetables after fitting on the `D` fixture, with and without pruning
+_EXPECT_FULL = tuple(map(frozenset, ["ABC", "AB", "A", "B", "C"]))
+_EXPECT_PRUNED = tuple(map(frozenset, ["ABC", "A", "B", "C"]))
 
 
 def to_tabular_df(D):
     return D.map(list).str.join("|").str.get_dummies(sep="|")
 
 
-def _id(args):
-    return args
+@lru_cache(maxsize=None)
+def _encode(transactions, tabular=False):
+    """memoized encoding of a tuple of transactions, to be treated as read-only"""
+    D = pd.Series(list(transactions))
+    return to_tabular_df(D) if tabular else D
+
+
+@pytest.fixture(scope="module")
+def transactional_D():
+    return _encode(("ABC",) * 5 + ("AB", "A", "B"))
+
+
+@pytest.fixture(scope="module")
+def tabular_D():
+    return _encode(("ABC",) * 5 + ("AB", "A", "B"), tabular=True)
+
+
+@pytest.fixture(scope="module")
+def new_D():
+    # unseen data, including an item ("D") absent from the training data
+    return _encode(("AB",) * 2 + ("ABD", "AC", "B"), tabular=True)
+
+
+@pytest.fixture(scope="module")
+def D(request):
+    # defaults to the transactional format when not parametrized
+    return request.getfixturevalue(getattr(request, "param", "transactional_D"))
+
+
+@pytest.fixture(scope="module")
+def prefit_slim(D):
+    return SLIM().prefit(D)
+
+
+@pytest.fixture(scope="module")
+def slim_fit_pruning(D):
+    return SLIM(pruning=True).fit(D)
+
+
+@pytest.fixture(scope="module")
+def slim_fit_nopruning(D):
+    return SLIM(pruning=False).fit(D)
 
 
 def test_to_vertical(D):
@@ -31,6 +70,57 @@ def test_to_vertical(D):
     assert list(vert2.keys()) == list("BC")
 
 
+@pytest.mark.parametrize(
+    "sparse", ["none", "zero_fill", "true_fill", "na_fill", "mixed"]
+)
+def test_tabular_to_vertical(transactional_D, tabular_D, sparse):
+    if sparse == "zero_fill":
+        tabular_D = tabular_D.astype(pd.SparseDtype(bool, False))
+    elif sparse == "true_fill":
+        tabular_D = tabular_D.astype(pd.SparseDtype(bool, True))
+    elif sparse == "na_fill":
+        tabular_D = tabular_D.astype(pd.SparseDtype(object, pd.NA))
+    elif sparse == "mixed":
+        tabular_D = tabular_D.astype(
+            {
+                "A": pd.SparseDtype(bool, False),
+                "B": bool,
+                "C": pd.SparseDtype(bool, True),
+            }
+        )
+    vert = _tabular_to_vertical(tabular_D)
+    assert list(vert.keys()) == list("ABC")
+    assert vert == _to_vertical(transactional_D)
+
+
+# codetables for the complex_evaluate tests, as (itemset, usage) pairs
+_COMPLEX_CODETABLE_1 = [
+    (frozenset("ABC"), Bitmap({0, 5})),
+    (frozenset("AB"), Bitmap({1})),
+    (frozenset("BC"), Bitmap({4})),
+    (frozenset("DE"), Bitmap({4, 5})),
+    (frozenset("B"), Bitmap({3})),
+    (frozenset("A"), Bitmap({2})),
+    (frozenset("C"), Bitmap({2})),
+    (frozenset("D"), Bitmap()),
+    (frozenset("E"), Bitmap()),
+]
+_COMPLEX_KEYS_1, _COMPLEX_USAGES_1 = zip(*_COMPLEX_CODETABLE_1)
+
+_COMPLEX_CODETABLE_2 = [
+    (frozenset("CDE"), Bitmap({4, 5})),
+    (frozenset("AB"), Bitmap({0, 1, 5})),
+    (frozenset("BC"), Bitmap()),
+    (frozenset("DE"), Bitmap()),
+    (frozenset("B"), Bitmap({3, 4})),
+    (frozenset("A"), Bitmap({2})),
+    (frozenset("C"), Bitmap({0, 2})),
+    (frozenset("D"), Bitmap()),
+    (frozenset("E"), Bitmap()),
+]
+_COMPLEX_KEYS_2, _COMPLEX_USAGES_2 = zip(*_COMPLEX_CODETABLE_2)
+
+
 def test_complex_evaluate():
     """
     A   B   C
@@ -44,21 +134,9 @@ def test_complex_evaluate():
     D = ["ABC", "AB", "AC", "B", "BCDE", "ABCDE"]
     slim.prefit(D)
 
-    u = {
-        frozenset("ABC"): {0, 5},
-        frozenset("AB"): {1},
-        frozenset("BC"): {4},
-        frozenset("DE"): {4, 5},
-        frozenset("B"): {3},
-        frozenset("A"): {2},
-        frozenset("C"): {2},
-        frozenset("D"): {},
-        frozenset("E"): {},
-    }
-
-    u = {k: Bitmap(v) for k, v in u.items()}
-
-    slim.codetable_.update(u)
+    usages = [tids.copy() for tids in _COMPLEX_USAGES_1]
+    slim.codetable_.update(zip(_COMPLEX_KEYS_1, usages))
+    u = dict(zip(_COMPLEX_KEYS_1, _COMPLEX_USAGES_1))
 
     cand = frozenset("CDE")
     _, _, updated = slim.evaluate(cand)
@@ -85,21 +163,9 @@ def test_complex_evaluate_2():
     D = ["ABC", "AB", "AC", "B", "BCDE", "ABCDE"]
     slim.prefit(D)
 
-    u = {
-        frozenset("CDE"): {4, 5},
-        frozenset("AB"): {0, 1, 5},
-        frozenset("BC"): {},
-        frozenset("DE"): {},
-        frozenset("B"): {3, 4},
-        frozenset("A"): {2},
-        frozenset("C"): {0, 2},
-        frozenset("D"): {},
-        frozenset("E"): {},
-    }
-
-    u = {k: Bitmap(v) for k, v in u.items()}
-
-    slim.codetable_.update(u)
+    usages = [tids.copy() for tids in _COMPLEX_USAGES_2]
+    slim.codetable_.update(zip(_COMPLEX_KEYS_2, usages))
+    u = dict(zip(_COMPLEX_KEYS_2, _COMPLEX_USAGES_2))
 
     cand = frozenset("ABC")
     _, _, updated = slim.evaluate(cand)
@@ -115,13 +181,11 @@ def test_complex_evaluate_2():
 
 
 def test_generate_candidate_1():
-    codetable = SortedDict(
-        {
-            frozenset("A"): Bitmap(range(0, 7)),
-            frozenset("B"): Bitmap([0, 1, 2, 3, 4, 5, 7]),
-            frozenset("C"): Bitmap(range(0, 5)),
-        }
-    )
+    codetable = {
+        frozenset("A"): Bitmap(range(0, 7)),
+        frozenset("B"): Bitmap([0, 1, 2, 3, 4, 5, 7]),
+        frozenset("C"): Bitmap(range(0, 5)),
+    }
 
     new_candidates = generate_candidates(codetable)
     assert new_candidates == [
@@ -134,7 +198,7 @@ def test_generate_candidate_2():
     usage = [Bitmap(_) for _ in (range(6), [6], [7], range(5))]
 
     index = list(map(frozenset, ["AB", "A", "B", "C"]))
-    codetable = SortedDict(zip(index, usage))
+    codetable = dict(zip(index, usage))
 
     new_candidates = generate_candidates(codetable)
     assert new_candidates == [(frozenset("ABC"), 5)]
@@ -145,33 +209,29 @@ def test_generate_candidate_stack():
 
     index = list(map(frozenset, ["ABC", "A", "B", "C"]))
 
-    codetable = SortedDict(zip(index, usage))
+    codetable = dict(zip(index, usage))
 
     new_candidates = generate_candidates(codetable, stack={frozenset("AB")})
     assert new_candidates == []
 
 
-@pytest.mark.parametrize("preproc", [to_tabular_df, _id])
-def test_prefit(preproc):
-    D = pd.Series(["ABC"] * 5 + ["BC", "B", "C"])
-    D = preproc(D)
+@pytest.mark.parametrize("tabular", [True, False])
+def test_prefit(tabular):
+    D = _encode(("ABC",) * 5 + ("BC", "B", "C"), tabular=tabular)
     slim = SLIM().prefit(D)
-    np.testing.assert_almost_equal(slim.model_size_, 9.614, 3)
-    np.testing.assert_almost_equal(slim.data_size_, 29.798, 3)
+    np.testing.assert_allclose(slim.model_size_, 9.614, atol=1e-3)
+    np.testing.assert_allclose(slim.data_size_, 29.798, atol=1e-3)
     assert len(slim.codetable_) == 3
     assert list(slim.codetable_) == list(map(frozenset, ["B", "C", "A"]))
 
 
-def test_get_support(D):
-    slim = SLIM().prefit(D)
-    assert len(slim.get_support(*frozenset("ABC"))) == 5
-    assert len(slim.get_support("C")) == 5
-    assert slim.get_support.cache_info().currsize > 0
+def test_get_support(prefit_slim):
+    assert len(prefit_slim.get_support(*frozenset("ABC"))) == 5
+    assert len(prefit_slim.get_support("C")) == 5
+    assert prefit_slim.get_support.cache_info().currsize > 0
 
 
-def test_compute_sizes_1(D):
-    slim = SLIM()
-    slim.prefit(D)
+def test_compute_sizes_1(prefit_slim):
     CT = {
         frozenset("ABC"): Bitmap(range(0, 5)),
         frozenset("AB"): Bitmap([5]),
@@ -179,14 +239,12 @@ def test_compute_sizes_1(D):
         frozenset("B"): Bitmap([7]),
     }
 
-    data_size, model_size = slim._compute_sizes(CT)
-    np.testing.assert_almost_equal(data_size, 12.4, 2)
-    np.testing.assert_almost_equal(model_size, 20.25, 2)
+    data_size, model_size = prefit_slim._compute_sizes(CT)
+    np.testing.assert_allclose(data_size, 12.4, atol=1e-2)
+    np.testing.assert_allclose(model_size, 20.25, atol=1e-2)
 
 
-def test_compute_sizes_2(D):
-    slim = SLIM()
-    slim.prefit(D)
+def test_compute_sizes_2(prefit_slim):
     CT = {
         frozenset("ABC"): Bitmap(range(0, 5)),
         frozenset("A"): Bitmap([5, 6]),
@@ -194,81 +252,94 @@ def test_compute_sizes_2(D):
         frozenset("C"): Bitmap(),
     }
 
-    data_size, model_size = slim._compute_sizes(CT)
-    np.testing.assert_almost_equal(data_size, 12.92, 2)
-    np.testing.assert_almost_equal(model_size, 12.876, 2)
+    data_size, model_size = prefit_slim._compute_sizes(CT)
+    np.testing.assert_allclose(data_size, 12.92, atol=1e-2)
+    np.testing.assert_allclose(model_size, 12.876, atol=1e-2)
 
 
-@pytest.mark.parametrize("preproc,pass_y", ([to_tabular_df, False], [_id, True]))
-def test_fit_pruning(D, preproc, pass_y):
+@pytest.mark.parametrize(
+    "D,pass_y", (["tabular_D", False], ["transactional_D", True]), indirect=["D"]
+)
+def test_fit_pruning(D, pass_y):
     slim = SLIM(pruning=True)
-    y = None if not pass_y else np.array([1] * len(D))
-    D = preproc(D)
+    y = None if not pass_y else np.ones(len(D), dtype=np.int8)
     self = slim.fit(D, y=y)
-    assert list(self.codetable_) == list(map(frozenset, ["ABC", "A", "B", "C"]))
+    assert list(self.codetable_) == list(_EXPECT_PRUNED)
 
 
-@pytest.mark.parametrize("preproc,pass_y", ([to_tabular_df, True], [_id, False]))
-def test_fit_no_pruning(D, preproc, pass_y):
+@pytest.mark.parametrize(
+    "D,pass_y", (["tabular_D", True], ["transactional_D", False]), indirect=["D"]
+)
+def test_fit_no_pruning(D, pass_y):
     slim = SLIM(pruning=False)
-    y = None if not pass_y else np.array([1] * len(D))
-    D = preproc(D)
+    y = None if not pass_y else np.ones(len(D), dtype=np.int8)
     self = slim.fit(D, y=y)
-    assert list(self.codetable_) == list(map(frozenset, ["ABC", "AB", "A", "B", "C"]))
+    assert list(self.codetable_) == list(_EXPECT_FULL)
 
 
-def test_prune(D):
-    slim = SLIM(pruning=False).fit(D)
+def test_prune(slim_fit_nopruning):
+    slim = slim_fit_nopruning
     prune_set = [frozenset("AB")]
 
     new_codetable, new_data_size, new_model_size = slim._prune(
-        slim.codetable_, prune_set, slim.model_size_, slim.data_size_
+        slim.codetable_.copy(), prune_set, slim.model_size_, slim.data_size_
     )
 
-    assert list(new_codetable) == list(map(frozenset, ["ABC", "A", "B", "C"]))
-    np.testing.assert_almost_equal(new_data_size, 12.92, 2)
+    assert list(new_codetable) == list(_EXPECT_PRUNED)
+    np.testing.assert_allclose(new_data_size, 12.92, atol=1e-2)
 
     total_enc_size = new_data_size + new_model_size
-    np.testing.assert_almost_equal(total_enc_size, 26, 0)
+    np.testing.assert_allclose(total_enc_size, 26, atol=1)
 
 
-def test_prune_empty(D):
-    slim = SLIM(pruning=False).fit(D)
+def test_prune_empty(slim_fit_nopruning):
+    slim = slim_fit_nopruning
     prune_set = [frozenset("ABC")]
 
     # nothing to prune so we should get the exact same codetable
 
     new_codetable, new_data_size, new_model_size = slim._prune(
-        slim.codetable_, prune_set, slim.model_size_, slim.data_size_
+        slim.codetable_.copy(), prune_set, slim.model_size_, slim.data_size_
     )
 
-    assert list(new_codetable) == list(map(frozenset, ["ABC", "AB", "A", "B", "C"]))
+    assert list(new_codetable) == list(_EXPECT_FULL)
 
 
-def test_decision_function(D):
+@pytest.mark.parametrize(
+    "dtype",
+    [
+        pd.SparseDtype(bool, False),
+        pd.SparseDtype(bool, True),
+        pd.SparseDtype(object, pd.NA),
+    ],
+    ids=["zero_fill", "true_fill", "na_fill"],
+)
+def test_fit_sparse(tabular_D, dtype):
+    D = tabular_D.astype(dtype)
     slim = SLIM(pruning=True).fit(D)
+    assert list(slim.codetable_) == list(_EXPECT_PRUNED)
+    pd.testing.assert_frame_equal(slim.cover(D), slim.cover(tabular_D))
 
-    new_D = pd.Series(["AB"] * 2 + ["ABD", "AC", "B"])
-    new_D = new_D.str.join("|").str.get_dummies(sep="|")
 
+def test_decision_function(slim_fit_pruning, new_D):
+    slim = slim_fit_pruning
     dists = slim.decision_function(new_D)
     assert dists.dtype == np.float32
     assert len(dists) == len(new_D)
-    np.testing.assert_array_almost_equal(
-        dists.values, np.array([-1.17, -1.17, -1.17, -2.17, -2.17]), decimal=2
+    np.testing.assert_allclose(
+        dists.values, np.array([-1.17, -1.17, -1.17, -2.17, -2.17]), atol=1e-2
     )
 
 
-def test_cover_discover_compat(D):
-    s = SLIM()
-    s.fit(D)
+def test_cover_discover_compat(D, slim_fit_pruning):
+    s = slim_fit_pruning
     mat = s.discover(usage_tids=False, singletons=True) * s.cover(D)
     assert mat.notna().sum().all()
 
 
-def test_reconstruct(D):
-    slim = SLIM().fit(D)
-    s = slim.reconstruct().map("".join)  # originally a string so we have to join
+def test_reconstruct(slim_fit_pruning):
+    s = slim_fit_pruning.reconstruct()
+    s = s.map("".join)  # originally a string so we have to join
     true_s = pd.Series(["ABC"] * 5 + ["AB", "A", "B"])
     pd.testing.assert_series_equal(s, true_s)
 
@@ -9,6 +9,7 @@ from ..utils import (
     _check_growth_rate,
     _check_min_supp,
     _check_random_state,
+    bitmap_from_array,
     bron_kerbosch,
     filter_maximal,
     filter_minimal,
@@ -19,6 +20,7 @@ from ..utils import (
 import numpy as np
 import pandas as pd
 import pytest
+from pyroaring import BitMap as Bitmap
 
 
 def test_check_random_state():
@@ -84,6 +86,30 @@ def test_intersect2d():
     np.testing.assert_array_equal(b_ind, np.array([2]))
 
 
+@pytest.mark.parametrize("values", [np.array([5, 0, 7]), {0, 5, 7}, [7, 5, 0, 5]])
+def test_bitmap_from_array(values):
+    assert bitmap_from_array(values) == Bitmap([0, 5, 7])
+
+
+@pytest.mark.parametrize("values", [np.array([], dtype=np.int64), [], set()])
+def test_bitmap_from_array_empty(values):
+    assert len(bitmap_from_array(values)) == 0
+
+
+@pytest.mark.parametrize(
+    "values", [np.array([-1, 3]), np.array([2 ** 32 + 1]), [-1], [2 ** 32]]
+)
+def test_bitmap_from_array_overflow(values):
+    with pytest.raises(OverflowError):
+        bitmap_from_array(values)
+
+
+@pytest.mark.parametrize("values", [np.array([1.5, 2.0]), [0.5]])
+def test_bitmap_from_array_wrong_type(values):
+    with pytest.raises(TypeError):
+        bitmap_from_array(values)
+
+
 def test_bron_kerbosch():
     candidates = {
         "A": "BCE",
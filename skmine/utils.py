@@ -3,6 +3,7 @@ utils functions
 """
 
 import numbers
+from array import array
 from itertools import count
 
 import numpy as np
@@ -11,6 +12,7 @@ import scipy.sparse
 from numpy.core.numeric import normalize_axis_tuple
 from numpy.core.overrides import array_function_dispatch
 from numpy.lib.stride_tricks import as_strided
+from pyroaring import BitMap as Bitmap
 from sortedcontainers import SortedList
 
 
@@ -155,6 +157,39 @@ def _check_D_y(D, y=None):
     return D, y
 
 
+def bitmap_from_array(values):
+    """
+    Build a Bitmap from non-negative integers, in a single call
+
+    Iterating over a numpy array makes ``Bitmap`` add elements one at a time.
+    Passing the values as a buffer of unsigned ints lets pyroaring add them in bulk.
+
+    Parameters
+    ----------
+    values: np.ndarray or Iterable[int]
+        integers to store in the bitmap
+
+    Returns
+    -------
+    Bitmap
+
+    Raises
+    ------
+    TypeError
+        if ``values`` are not integers
+    OverflowError
+        if ``values`` do not fit in unsigned 32 bits integers
+    """
+    values = np.asarray(values if isinstance(values, np.ndarray) else list(values))
+    if values.size == 0:
+        return Bitmap()
+    if not np.issubdtype(values.dtype, np.integer):
+        raise TypeError(f"values should be integers, got dtype {values.dtype}")
+    if values.min() < 0 or values.max() > np.iinfo(np.uint32).max:
+        raise OverflowError("values should fit in unsigned 32 bits integers")
+    return Bitmap(array("I", values.astype(np.uintc, copy=False).tobytes()))
+
+
 def intersect2d(ar1, ar2, return_indices=True):
     """
     Find the intersection of two 2 dimnesional arrays